@@ -1,15 +1,35 @@
-import json
+import orjson # Faster JSON parsing straight from bytes
 import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import atexit
+import html
 from telegram import Update, ForceReply, InputFile # Import InputFile
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
-import io # For handling binary data in memory
-import requests # Ensure requests is imported
+import tempfile # PDFs are streamed to disk rather than buffered in memory
+import httpx # Async HTTP client (already a python-telegram-bot dependency)
 import os
+import re
+import pickle
+import asyncio
+import functools
+from dataclasses import dataclass
+from bisect import bisect_left
 
 # Enable logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO
+# The QueueHandler still interpolates each message (and any traceback) on the
+# calling thread (the event loop); the QueueListener's own thread applies the
+# format string and writes to stderr, so stream I/O stays off the event loop
+log_stream_handler = logging.StreamHandler()
+log_stream_handler.setFormatter(
+    logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 )
+log_queue = queue.Queue(-1)
+log_listener = QueueListener(log_queue, log_stream_handler, respect_handler_level=True)
+logging.getLogger().addHandler(QueueHandler(log_queue))
+logging.getLogger().setLevel(logging.INFO)
+log_listener.start()
+atexit.register(log_listener.stop) # Flushes queued records on exit, including the token check below
 logger = logging.getLogger(__name__)
 
 # --- Configuration ---
@@ -19,44 +39,85 @@ if not TELEGRAM_BOT_TOKEN:
     exit(1) # Exit if token is not set
 JSON_FILE_PATH = "all_regions_detailed_data.json"
 REGIONS_JSON_FILE_PATH = "regions.json" # New: Path to regions.json
+CACHE_FILE_PATH = "exam_data.cache.pkl" # Search index built from the exam data on the last run
+CACHE_FORMAT_VERSION = 4 # Bump whenever the cached structures or how they are built change
+
+@dataclass(slots=True, frozen=True)
+class Entry:
+    """A single exam result entry; attribute access avoids a dict lookup per field."""
+    year: str
+    region: str
+    district: str
+    township: str
+    exam_center: str
+    alphabet_code: str
+    download_link: str
 
 # Global variables to store data
-EXAM_DATA = {} # Stores the structured exam results by year
 REGION_LINK_MAP = {} # Maps region name to its original detail URL (for Referer header)
+ALL_ENTRIES = [] # Flat list of Entry objects across all years; an entry's position is its id
+INDEX = {} # Exact-match fast path: maps folded field values and their tokens to the ids of every entry they match
+HAYSTACKS = [] # HAYSTACKS[i] is entry i's folded searchable fields, joined with \x1f
+PAIR_INDEX = {} # Maps every one- and two-character substring of HAYSTACKS to the sorted ids of entries containing it
+YEAR_SPANS = {} # Maps year to its (first_id, end_id) range; ALL_ENTRIES is grouped by year
+FILE_ID_CACHE = {} # Maps download URL to the Telegram file_id of the PDF once it has been uploaded
+DOWNLOAD_SEMAPHORE = asyncio.Semaphore(8) # Caps concurrent PDF downloads across all users
+SEND_INTERVAL_SECONDS = 0.05 # Pause between replies to stay under Telegram's ~30 messages/sec limit
+DOWNLOAD_CHUNK_SIZE = 64 * 1024 # Bytes written to the temporary PDF file per chunk
+MESSAGE_BATCH_LIMIT = 3800 # Batched text replies stay safely under Telegram's 4096-character message limit
+
+# A leading four-digit year followed by the actual query, e.g. "2025 ရန်ကုန်"
+YEAR_QUERY_RE = re.compile(r'(\d{4})\s+(.+)', re.DOTALL)
+
+# Separators inside field values; the pieces between them (e.g. the village in
+# "အထက၊ဖလုံ(တိုက်ကြီး)") are indexed as exact keys alongside the whole value
+FIELD_TOKEN_RE = re.compile(r'[\s၊။(),/\-]+')
+
+# Zero-width characters appear inconsistently in Myanmar text (the data has stray
+# ZWNJs that users don't type), so they are dropped before matching
+SEARCH_FOLD_TABLE = str.maketrans("", "", "\u200b\u200c\u200d\ufeff")
+
+# Entry fields that user queries are matched against
+SEARCH_FIELDS = ("region", "district", "township", "exam_center", "alphabet_code")
 
 def load_exam_data(file_path, regions_file_path):
     """Loads the exam data from the JSON files."""
-    global EXAM_DATA, REGION_LINK_MAP
+    global REGION_LINK_MAP
     
-    # Load all_regions_detailed_data.json
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            EXAM_DATA = json.load(f)
+    # Load all_regions_detailed_data.json, unless the cache from a previous run still matches it
+    if not load_search_cache(file_path):
+        try:
+            with open(file_path, 'rb') as f:
+                exam_data = orjson.loads(f.read())
         
-        loaded_years = ", ".join(EXAM_DATA.keys()) if EXAM_DATA else "None"
-        total_entries_count = sum(len(v) for v in EXAM_DATA.values())
-        logger.info(f"Successfully loaded exam data from {file_path}. Years found: [{loaded_years}]. Total entries: {total_entries_count}")
+            loaded_years = ", ".join(exam_data.keys()) if exam_data else "None"
+            total_entries_count = sum(len(v) for v in exam_data.values())
+            logger.info(f"Successfully loaded exam data from {file_path}. Years found: [{loaded_years}]. Total entries: {total_entries_count}")
         
-    except FileNotFoundError:
-        logger.error(f"Error: Exam data JSON file not found at {file_path}")
-        EXAM_DATA = {}
-    except json.JSONDecodeError:
-        logger.error(f"Error: Could not decode JSON from {file_path}. Check file format.")
-        EXAM_DATA = {}
-    except Exception as e:
-        logger.error(f"An unexpected error occurred while loading exam data JSON: {e}")
-        EXAM_DATA = {}
+        except FileNotFoundError:
+            logger.error(f"Error: Exam data JSON file not found at {file_path}")
+            exam_data = {}
+        except orjson.JSONDecodeError:
+            logger.error(f"Error: Could not decode JSON from {file_path}. Check file format.")
+            exam_data = {}
+        except Exception as e:
+            logger.error(f"An unexpected error occurred while loading exam data JSON: {e}")
+            exam_data = {}
+
+        build_search_index(exam_data)
+        if exam_data:
+            save_search_cache(file_path)
 
     # Load regions.json to build the Referer link map
     try:
-        with open(regions_file_path, 'r', encoding='utf-8') as f:
-            regions_data = json.load(f)
+        with open(regions_file_path, 'rb') as f:
+            regions_data = orjson.loads(f.read())
             REGION_LINK_MAP = {region['region_name']: region['link'] for region in regions_data}
         logger.info(f"Successfully loaded region links from {regions_file_path}. Total regions: {len(REGION_LINK_MAP)}")
     except FileNotFoundError:
         logger.error(f"Error: Regions JSON file not found at {regions_file_path}")
         REGION_LINK_MAP = {}
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         logger.error(f"Error: Could not decode JSON from {regions_file_path}. Check file format.")
         REGION_LINK_MAP = {}
     except Exception as e:
@@ -64,48 +125,158 @@ def load_exam_data(file_path, regions_file_path):
         REGION_LINK_MAP = {}
 
 
-def search_exam_results(query: str, year_filter: str = None):
+def load_search_cache(file_path):
+    """
+    Restores the search index from CACHE_FILE_PATH if it was
+    written for the current version of file_path (same mtime and size) by the
+    current CACHE_FORMAT_VERSION.
+    Returns True if the cache was used.
+    """
+    global ALL_ENTRIES, INDEX, YEAR_SPANS, HAYSTACKS, PAIR_INDEX
+
+    try:
+        source_stat = os.stat(file_path)
+        with open(CACHE_FILE_PATH, 'rb') as f:
+            cache_key, cached_data = pickle.load(f)
+        if cache_key != (CACHE_FORMAT_VERSION, source_stat.st_mtime_ns, source_stat.st_size):
+            logger.info(f"Search cache {CACHE_FILE_PATH} is stale, rebuilding from {file_path}")
+            return False
+        # Unpacked inside the try so a cache of an unexpected shape falls back to a rebuild
+        cached_entries, cached_index, cached_year_spans, cached_haystacks, cached_pair_index = cached_data
+    except FileNotFoundError:
+        return False
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable search cache {CACHE_FILE_PATH}: {e}")
+        return False
+
+    ALL_ENTRIES, INDEX, YEAR_SPANS = cached_entries, cached_index, cached_year_spans
+    HAYSTACKS, PAIR_INDEX = cached_haystacks, cached_pair_index
+    search_exam_results.cache_clear() # Cached ids refer to the previous ALL_ENTRIES
+    logger.info(f"Loaded search index from {CACHE_FILE_PATH}. Total entries: {len(ALL_ENTRIES)}")
+    return True
+
+
+def save_search_cache(file_path):
+    """Writes the search index to CACHE_FILE_PATH, keyed by format version and file_path's mtime and size."""
+    try:
+        source_stat = os.stat(file_path)
+        cache_key = (CACHE_FORMAT_VERSION, source_stat.st_mtime_ns, source_stat.st_size)
+        with open(CACHE_FILE_PATH, 'wb') as f:
+            pickle.dump((cache_key, (ALL_ENTRIES, INDEX, YEAR_SPANS, HAYSTACKS, PAIR_INDEX)), f, protocol=5)
+        logger.info(f"Saved search cache to {CACHE_FILE_PATH}")
+    except Exception as e:
+        logger.warning(f"Could not write search cache {CACHE_FILE_PATH}: {e}")
+
+
+def fold_search_text(text: str) -> str:
+    """
+    Normalizes text for matching: lowercases it and drops zero-width characters.
+    The translate pass is extra work on top of lower() for any non-ASCII text,
+    including every Myanmar query and field; only ASCII-only text skips it,
+    since it cannot contain zero-width characters.
+    """
+    text = text.lower()
+    if text.isascii():
+        return text
+    return text.translate(SEARCH_FOLD_TABLE)
+
+
+def build_search_index(exam_data):
+    """
+    Flattens exam_data (results keyed by year) into ALL_ENTRIES and builds the
+    lookup tables used by search_exam_results.
+    Every INDEX key is resolved to its full substring match set up front, so an
+    exact hit returns the same results a scan would.
+    """
+    global ALL_ENTRIES, INDEX, YEAR_SPANS, HAYSTACKS, PAIR_INDEX
+
+    ALL_ENTRIES = []
+    YEAR_SPANS = {}
+    for year, entries_for_year in exam_data.items():
+        YEAR_SPANS[year] = (len(ALL_ENTRIES), len(ALL_ENTRIES) + len(entries_for_year))
+        for entry in entries_for_year:
+            ALL_ENTRIES.append(Entry(
+                year=year,
+                region=entry.get("region", ""),
+                district=entry.get("district", ""),
+                township=entry.get("township", ""),
+                exam_center=entry.get("exam_center", ""),
+                alphabet_code=entry.get("alphabet_code", ""),
+                download_link=entry.get("download_link", "N/A")
+            ))
+
+    # Searchable columns, folded once here and never per query
+    search_columns = [[fold_search_text(getattr(entry, field)) for entry in ALL_ENTRIES] for field in SEARCH_FIELDS]
+
+    index_keys = set()
+    for column in search_columns:
+        for value in column:
+            if value: # Empty values would make "" an exact key matching every entry
+                index_keys.add(value)
+            index_keys.update(token for token in FIELD_TOKEN_RE.split(value) if token)
+
+    # Fields are joined with \x1f, which can only produce a cross-field match
+    # for queries containing it.
+    HAYSTACKS = ["\x1f".join(row) for row in zip(*search_columns)]
+
+    PAIR_INDEX = {}
+    for entry_id, haystack in enumerate(HAYSTACKS):
+        for piece in set(haystack) | {haystack[i:i + 2] for i in range(len(haystack) - 1)}:
+            PAIR_INDEX.setdefault(piece, []).append(entry_id)
+
+    INDEX = {key: list(match_entries(key, 0, len(ALL_ENTRIES))) for key in index_keys}
+    search_exam_results.cache_clear() # Cached ids refer to the previous ALL_ENTRIES
+    logger.info(f"Built search index: {len(ALL_ENTRIES)} entries, {len(INDEX)} keys.")
+
+
+def match_entries(query_lower: str, first_id: int, end_id: int):
+    """
+    Returns the ids of entries in [first_id, end_id) with a searchable field
+    containing query_lower. Every match contains each two-character piece of
+    the query, so only the entries listed under the query's rarest pair in
+    PAIR_INDEX need an actual substring check.
+    """
+    if not query_lower:
+        return range(first_id, end_id)
+    if len(query_lower) <= 2: # The index is exact for queries this short
+        entry_ids = PAIR_INDEX.get(query_lower, ())
+        return entry_ids[bisect_left(entry_ids, first_id):bisect_left(entry_ids, end_id)]
+
+    candidate_ids = min(
+        (PAIR_INDEX.get(query_lower[i:i + 2], ()) for i in range(len(query_lower) - 1)),
+        key=len,
+    )
+    candidate_ids = candidate_ids[bisect_left(candidate_ids, first_id):bisect_left(candidate_ids, end_id)]
+    return [entry_id for entry_id in candidate_ids if query_lower in HAYSTACKS[entry_id]]
+
+
+@functools.lru_cache(maxsize=1024)
+def search_exam_results(query_lower: str, year_filter: str = None):
     """
     Searches the loaded exam data for results matching the query.
     The search is case-insensitive and looks for matches in region, district,
     township, exam_center, and alphabet_code.
     Optionally filters by year.
+    The query must already be passed through fold_search_text so equivalent
+    queries share a cache slot.
+    Returns a tuple of ids into ALL_ENTRIES.
     """
-    if not EXAM_DATA:
-        return []
+    if not ALL_ENTRIES:
+        return ()
+    if year_filter and year_filter not in YEAR_SPANS:
+        return ()
 
-    query_lower = query.lower()
-    found_results = []
+    # The year filter picks a contiguous id range up front; without one every entry is in range
+    first_id, end_id = YEAR_SPANS[year_filter] if year_filter else (0, len(ALL_ENTRIES))
 
-    for year, entries_for_year in EXAM_DATA.items():
-        if year_filter and year_filter != year:
-            continue
+    # Exact field values and tokens are a dict hit; anything else checks
+    # only the candidates the pair index leaves in range.
+    entry_ids = INDEX.get(query_lower)
+    if entry_ids is None:
+        return tuple(match_entries(query_lower, first_id, end_id))
 
-        for entry in entries_for_year:
-            region = entry.get("region", "")
-            district = entry.get("district", "")
-            township = entry.get("township", "")
-            exam_center = entry.get("exam_center", "")
-            alphabet_code = entry.get("alphabet_code", "")
-            download_link = entry.get("download_link", "N/A")
-            entry_year = year
-
-            if (query_lower in region.lower() or
-                query_lower in district.lower() or
-                query_lower in township.lower() or
-                query_lower in exam_center.lower() or
-                query_lower in alphabet_code.lower()):
-
-                found_results.append({
-                    "year": entry_year,
-                    "region": region,
-                    "district": district,
-                    "township": township,
-                    "exam_center": exam_center,
-                    "alphabet_code": alphabet_code,
-                    "download_link": download_link # Keep the download link here
-                })
-    return found_results
+    # Index ids are sorted, so the hits in range are one contiguous slice
+    return tuple(entry_ids[bisect_left(entry_ids, first_id):bisect_left(entry_ids, end_id)])
 
 # --- Telegram Bot Handlers ---
 
@@ -128,25 +299,60 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         "I will search for matches and send the relevant PDF if available."
     )
 
+def batch_text_blocks(text_blocks, limit=MESSAGE_BATCH_LIMIT):
+    """Joins HTML text blocks into as few messages as possible, each at most limit characters."""
+    batch = ""
+    for block in text_blocks:
+        if batch and len(batch) + 2 + len(block) > limit:
+            yield batch
+            batch = ""
+        batch = f"{batch}\n\n{block}" if batch else block
+    if batch:
+        yield batch
+
+async def fetch_pdf(http_client: httpx.AsyncClient, res: Entry) -> str:
+    """
+    Streams the PDF for a search result to a temporary file and returns its path.
+    The caller is responsible for removing the file.
+    """
+    download_url = res.download_link
+    # --- Download the PDF with Referer ---
+    # Default to main page if specific region link not found (less ideal but fallback)
+    referer_url = REGION_LINK_MAP.get(res.region, "https://www.myanmarexam.org/")
+    # The temporary file is only created once a download slot is free, so queued
+    # downloads don't each hold an open file descriptor while they wait
+    async with DOWNLOAD_SEMAPHORE:
+        pdf_tmp = tempfile.NamedTemporaryFile(suffix='.pdf', delete=False)
+        try:
+            with pdf_tmp:
+                logger.info(f"Attempting to download {download_url} with Referer: {referer_url}")
+                async with http_client.stream('GET', download_url, headers={'Referer': referer_url}) as pdf_response:
+                    pdf_response.raise_for_status() # Raise an HTTPError for bad responses (4xx or 5xx)
+                    async for chunk in pdf_response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        pdf_tmp.write(chunk)
+        except BaseException:
+            os.remove(pdf_tmp.name)
+            raise
+    return pdf_tmp.name
+
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handles incoming text messages and searches for exam results."""
     user_query = update.message.text.strip()
     logger.info(f"User {update.effective_user.id} ({update.effective_user.first_name}) searched for: {user_query}")
 
-    if not EXAM_DATA:
+    if not ALL_ENTRIES:
         await update.message.reply_text(
             "I'm sorry, I couldn't load the exam data. Please ensure `all_regions_detailed_data.json` exists and is valid."
         )
         return
 
     year_filter = None
-    parsed_query = user_query.split(maxsplit=1)
+    year_match = YEAR_QUERY_RE.fullmatch(user_query)
 
-    if len(parsed_query) > 1 and parsed_query[0].isdigit() and len(parsed_query[0]) == 4:
-        potential_year = parsed_query[0]
-        if potential_year in EXAM_DATA:
-            year_filter = potential_year
-            actual_query = parsed_query[1]
+    if year_match:
+        potential_year = year_match.group(1)
+        if potential_year in YEAR_SPANS:
+            year_filter, actual_query = year_match.groups()
             logger.info(f"Detected year filter: {year_filter}, Actual query: {actual_query}")
         else:
             actual_query = user_query
@@ -154,90 +360,160 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     else:
         actual_query = user_query
 
-    results = search_exam_results(actual_query, year_filter)
+    # A message of only zero-width characters folds to "", which must not match everything
+    folded_query = fold_search_text(actual_query)
+    result_ids = search_exam_results(folded_query, year_filter) if folded_query else ()
+    results = [ALL_ENTRIES[entry_id] for entry_id in result_ids]
 
     if results:
-        # We will send each result as a separate message/file
+        # Sent before downloading so the user hears back right away
         await update.message.reply_text(f"Found {len(results)} result(s). Attempting to send PDFs...")
 
-        for i, res in enumerate(results):
-            region_name = res['region']
-            download_url = res['download_link']
-            
-            # --- Prepare Referer Header ---
-            # Default to main page if specific region link not found (less ideal but fallback)
-            referer_url = REGION_LINK_MAP.get(region_name, "https://www.myanmarexam.org/")
-
-            if download_url == 'N/A' or download_url.endswith('.pdf') is False:
-                message = (
-                    f"<b>Result {i+1}:</b>\n"
-                    f"<b>Year:</b> {res['year']}\n"
-                    f"<b>Region:</b> {res['region']}\n"
-                    f"<b>District:</b> {res['district']}\n"
-                    f"<b>Township:</b> {res['township']}\n"
-                    f"<b>Exam Center:</b> {res['exam_center']}\n"
-                    f"<b>Alphabet Code:</b> {res['alphabet_code']}\n"
-                    f"Download link not available or invalid: {download_url}"
+        # --- Phase 1: download every PDF Telegram doesn't already have, concurrently ---
+        http_client = context.bot_data["http"]
+        # Keyed by URL so a PDF shared by several results is fetched once
+        to_download = list({
+            res.download_link: res for res in results
+            if res.download_link.endswith('.pdf') and res.download_link not in FILE_ID_CACHE
+        }.values())
+        downloaded = await asyncio.gather(
+            *(fetch_pdf(http_client, res) for res in to_download), return_exceptions=True
+        )
+        pdf_by_url = {res.download_link: pdf for res, pdf in zip(to_download, downloaded)}
+
+        try:
+            # --- Collect text-only results and download failures into as few messages as possible ---
+            # Results without a PDF are grouped by location so the shared lines are rendered once
+            unlinked_groups = {} # (year, region, district, township) -> per-result lines
+            error_blocks = []
+            to_send = [] # (result number, result) pairs that have a PDF to send
+            for i, res in enumerate(results):
+                download_url = res.download_link
+
+                if download_url == 'N/A' or download_url.endswith('.pdf') is False:
+                    unlinked_groups.setdefault((res.year, res.region, res.district, res.township), []).append(
+                        f"<b>Result {i+1}:</b> {html.escape(res.exam_center)} ({html.escape(res.alphabet_code)})\n"
+                        f"Download link not available or invalid: {html.escape(download_url)}"
+                    )
+                    continue
+
+                download_error = pdf_by_url.get(download_url)
+                if isinstance(download_error, httpx.HTTPError):
+                    logger.error(f"Failed to download PDF for {res.region} ({res.exam_center}). Error: {download_error}")
+                    error_blocks.append(f"Could not download PDF for: {html.escape(res.region)} - {html.escape(res.exam_center)}. Error: {html.escape(str(download_error))}")
+                elif isinstance(download_error, Exception):
+                    logger.error(f"An unexpected error occurred while processing PDF for {res.region} ({res.exam_center}). Error: {download_error}")
+                    error_blocks.append(f"An error occurred while sending PDF for: {html.escape(res.region)} - {html.escape(res.exam_center)}. Error: {html.escape(str(download_error))}")
+                else:
+                    to_send.append((i, res))
+
+            text_blocks = []
+            for (year, region, district, township), result_lines in unlinked_groups.items():
+                group_header = (
+                    f"<b>Year:</b> {html.escape(year)}\n"
+                    f"<b>Region:</b> {html.escape(region)}\n"
+                    f"<b>District:</b> {html.escape(district)}\n"
+                    f"<b>Township:</b> {html.escape(township)}"
                 )
+                # A large group is cut into several blocks, each under the message limit and
+                # each repeating the header, so batch_text_blocks never sees an oversized block
+                group_block = group_header
+                for line in result_lines:
+                    if group_block != group_header and len(group_block) + 1 + len(line) > MESSAGE_BATCH_LIMIT:
+                        text_blocks.append(group_block)
+                        group_block = group_header
+                    group_block = f"{group_block}\n{line}"
+                text_blocks.append(group_block)
+            text_blocks.extend(error_blocks)
+
+            for message in batch_text_blocks(text_blocks):
                 await update.message.reply_html(message)
-                continue # Move to next result
 
-            # --- Download the PDF with Referer ---
-            try:
-                logger.info(f"Attempting to download {download_url} with Referer: {referer_url}")
-                headers = {'Referer': referer_url, 'User-Agent': 'Mozilla/5.0'} # Added User-Agent for better mimicry
-                pdf_response = requests.get(download_url, headers=headers, stream=True, timeout=30)
-                pdf_response.raise_for_status() # Raise an HTTPError for bad responses (4xx or 5xx)
-
-                # --- Send PDF to user ---
-                # Create a file-like object from the downloaded content
-                pdf_file = io.BytesIO(pdf_response.content)
-                
-                # Construct a descriptive filename
-                filename = f"{res['region']}_{res['district']}_{res['township']}_{res['exam_center']}_{res['alphabet_code']}_{res['year']}.pdf"
-                
-                # Trim filename if too long for Telegram (max 255 chars)
-                if len(filename) > 250:
-                    filename = f"{res['region']}_{res['alphabet_code']}_{res['year']}.pdf"
-                    if len(filename) > 250: # Even shorter if needed
-                        filename = f"ExamResult_{res['year']}.pdf"
-
-                # Send the document
-                await update.message.reply_document(
-                    document=InputFile(pdf_file, filename=filename),
-                    caption=(
-                        f"<b>Result {i+1}:</b>\n"
-                        f"<b>Year:</b> {res['year']}\n"
-                        f"<b>Region:</b> {res['region']}\n"
-                        f"<b>District:</b> {res['district']}\n"
-                        f"<b>Township:</b> {res['township']}\n"
-                        f"<b>Exam Center:</b> {res['exam_center']}\n"
-                        f"<b>Alphabet Code:</b> {res['alphabet_code']}" # FIXED: Removed extra </b>
-                    ),
-                    parse_mode='HTML'
+            # --- Phase 2: send PDFs in order, paced for Telegram's rate limits ---
+            for i, res in to_send:
+                await asyncio.sleep(SEND_INTERVAL_SECONDS)
+                download_url = res.download_link
+                caption = (
+                    f"<b>Result {i+1}:</b>\n"
+                    f"<b>Year:</b> {res.year}\n"
+                    f"<b>Region:</b> {res.region}\n"
+                    f"<b>District:</b> {res.district}\n"
+                    f"<b>Township:</b> {res.township}\n"
+                    f"<b>Exam Center:</b> {res.exam_center}\n"
+                    f"<b>Alphabet Code:</b> {res.alphabet_code}" # FIXED: Removed extra </b>
                 )
-                logger.info(f"Sent PDF for {res['region']} - {res['exam_center']}")
 
-            except requests.exceptions.RequestException as e:
-                error_message = f"Failed to download PDF for {res['region']} ({res['exam_center']}). Error: {e}"
-                logger.error(error_message)
-                await update.message.reply_text(f"Could not download PDF for: {res['region']} - {res['exam_center']}. Error: {e}")
-            except Exception as e:
-                error_message = f"An unexpected error occurred while processing PDF for {res['region']} ({res['exam_center']}). Error: {e}"
-                logger.error(error_message)
-                await update.message.reply_text(f"An error occurred while sending PDF for: {res['region']} - {res['exam_center']}. Error: {e}")
+                try:
+                    # --- Reuse a PDF Telegram already has ---
+                    # Sending by file_id skips both the download and the upload
+                    cached_file_id = FILE_ID_CACHE.get(download_url)
+                    if cached_file_id:
+                        await update.message.reply_document(document=cached_file_id, caption=caption, parse_mode='HTML')
+                        logger.info(f"Sent cached PDF for {res.region} - {res.exam_center}")
+                        continue
+
+                    # --- Send PDF to user ---
+                    # Construct a descriptive filename
+                    filename = f"{res.region}_{res.district}_{res.township}_{res.exam_center}_{res.alphabet_code}_{res.year}.pdf"
+
+                    # Trim filename if too long for Telegram (max 255 chars)
+                    if len(filename) > 250:
+                        filename = f"{res.region}_{res.alphabet_code}_{res.year}.pdf"
+                        if len(filename) > 250: # Even shorter if needed
+                            filename = f"ExamResult_{res.year}.pdf"
+
+                    # Send the document straight from its temporary file
+                    with open(pdf_by_url[download_url], 'rb') as pdf_file:
+                        sent_message = await update.message.reply_document(
+                            document=InputFile(pdf_file, filename=filename),
+                            caption=caption,
+                            parse_mode='HTML'
+                        )
+                    FILE_ID_CACHE[download_url] = sent_message.document.file_id
+                    # Later results sharing this URL go by file_id, so the file can go now
+                    os.remove(pdf_by_url.pop(download_url))
+                    logger.info(f"Sent PDF for {res.region} - {res.exam_center}")
+
+                except Exception as e:
+                    error_message = f"An unexpected error occurred while processing PDF for {res.region} ({res.exam_center}). Error: {e}"
+                    logger.error(error_message)
+                    await update.message.reply_text(f"An error occurred while sending PDF for: {res.region} - {res.exam_center}. Error: {e}")
+        finally:
+            # Only files that were never sent are left here
+            for pdf_path in pdf_by_url.values():
+                if isinstance(pdf_path, str): # Failed downloads hold an exception instead
+                    os.remove(pdf_path)
 
     else:
         await update.message.reply_text(
             f"No results found for '{user_query}'. Please try a different query."
         )
 
+async def post_init(application: Application) -> None:
+    """Creates the HTTP client shared by all handlers for PDF downloads."""
+    application.bot_data["http"] = httpx.AsyncClient(
+        headers={'User-Agent': 'Mozilla/5.0'}, # Added User-Agent for better mimicry
+        timeout=30,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=32, keepalive_expiry=60), # Keep-alive pool avoids a TLS handshake per PDF
+    )
+
+async def post_shutdown(application: Application) -> None:
+    """Closes the shared HTTP client."""
+    await application.bot_data["http"].aclose()
+
 def main() -> None:
     """Start the bot."""
     # Load data when the bot starts
     load_exam_data(JSON_FILE_PATH, REGIONS_JSON_FILE_PATH)
 
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("help", help_command))